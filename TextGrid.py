@@ -1,9 +1,7 @@
 #!python
 # -*- coding: utf-8 -*-
 
-import re, sys
-
-reIntervals = re.compile(r' +intervals \[[0-9]+\]:')
+import sys
 
 class TextGrid:
 	def __init__(self, fname):
@@ -12,63 +10,49 @@ class TextGrid:
 		self.parse()
 		
 	def parse(self):
+		# Single pass over the file, dispatching on the line prefix
+		object_class = None
+		self.size = None
+		self.itemRanges = list()
+		self.intervals = list()
+		content = self.content
+		intervals_j = None
+		for i, raw in enumerate(content):
+			l = raw.lstrip()
+			if l.startswith(b'intervals ['):
+				s_xmin, s_xmax, s_text = content[i+1:i+4]
+				intervals_j.append({
+					'xmin': float(s_xmin[s_xmin.rindex(b'=')+1:]),
+					'xmax': float(s_xmax[s_xmax.rindex(b'=')+1:]),
+					'text': s_text[s_text.index(b'"')+1:s_text.rindex(b'"')].decode('utf-8')
+					})
+			elif l.startswith(b'item [') and not l.startswith(b'item []'):
+				if self.itemRanges:
+					self.itemRanges[-1] = (self.itemRanges[-1][0], i)
+				self.itemRanges.append((i+1, len(content)))
+				intervals_j = list()
+				self.intervals.append(intervals_j)
+			elif raw.startswith(b'size = '):
+				self.size = int(raw.strip().replace(b'size = ', b''))
+			elif object_class is None and raw.startswith(b'Object class'):
+				object_class = raw.strip()
+
 		# Check the file type
-		i, l = self.findLineSW('Object class')
-		if i is None or l.strip()!='Object class = "TextGrid"':
+		if object_class != b'Object class = "TextGrid"':
 			raise Exception('Not a valid TextGrid file')
-		
-		# Get the size
-		i, l = self.findLineSW('size = ')
-		if i is None:
+
+		if self.size is None:
 			raise Exception("Size can't be determined...'")
-		self.size = int(l.strip().replace('size = ', ''))
-		
-		# Find item blocks
-		idx = list()
-		for j in range(self.size):
-			i, l = self.findLineSW('    item [%d]:' % (j+1), i+1)
-			idx.append(i)
-		idx.append(len(self.content))
-		self.itemRanges = list()
-		for j in range(self.size):
-			self.itemRanges.append((idx[j]+1, idx[j+1]))
-		
-		# Find intervals
-		self.intervals = list()
-		for j in range(self.size):
-			self.intervals.append(list())
-			i1 = self.itemRanges[j][0]
-			i2 = self.itemRanges[j][1]
-			while i1<i2:
-				l = self.content[i1]
-				if reIntervals.match(l) is not None:
-					interval = {
-						'xmin': float(self.content[i1+1].strip().replace('xmin = ', '')),
-						'xmax': float(self.content[i1+2].strip().replace('xmax = ', '')),
-						'text': self.content[i1+3].strip().replace('text = ', '').strip('"')
-						}
-					self.intervals[j].append(interval)
-					i1 += 4
-				else:
-					i1 += 1
-	
-	def findLineSW(self, line, start=0, end=None):
-		if end is None:
-			end = len(self.content)
-		for i, l in enumerate(self.content[start:end]):
-			if l.startswith(line):
-				return i+start, l
-		return None, None
 	
 	def matlabDisp(self):
-		s = 'x = struct();\n';
+		out = ['x = struct();\n']
 		for j in range(self.size):
 			if j==0:
-				s += 'x.interval(%d) = struct();\n' % (j+1)
-			for i in range(len(self.intervals[j])):
-				s += 'x.interval(%d).label(%d).x = [%f, %f];\n' % (j+1, i+1, self.intervals[j][i]['xmin'], self.intervals[j][i]['xmax'])
-				s += 'x.interval(%d).label(%d).text = \'%s\';\n' % (j+1, i+1, self.intervals[j][i]['text'])
-		print(s)
+				out.append(f'x.interval({j+1}) = struct();\n')
+			for i, interval in enumerate(self.intervals[j]):
+				out.append(f"x.interval({j+1}).label({i+1}).x = [{interval['xmin']:f}, {interval['xmax']:f}];\n")
+				out.append(f"x.interval({j+1}).label({i+1}).text = '{interval['text']}';\n")
+		print(''.join(out))
 
 #==============================================
 
@@ -34,29 +34,62 @@ import subprocess
 import argparse
 import platform
 import os.path
+import math
+import tempfile
 import re
+import mmap
+import struct
+from concurrent.futures import ProcessPoolExecutor
 import numpy
 
+# orjson, if available, serializes the NumPy arrays directly from their buffers. With
+# both backends, missing values (NaN, which is not valid JSON) are written as null.
+try:
+	import orjson
+	def _json_dumps(data):
+		return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+	import json
+	def _nan_to_none(x):
+		if isinstance(x, list):
+			return [_nan_to_none(v) for v in x]
+		return None if x != x else x
+	def _json_dumps(data):
+		return json.dumps(data, default=lambda a: _nan_to_none(a.tolist()), allow_nan=False).encode('utf-8')
+
 # Added options: wlength, maxfreq, nformants
 
 #=================================================
 
 praat_script = """
 	form Get formants
-		sentence filename
-		sentence filename_formant
+		sentence filelist
 		word method
 		positive time_step 0.005
         positive n_formants 5
         positive max_freq 5500
         positive w_len 0.025
 	endform
-	Read from file... 'filename$'
-	object_name$ = selected$("Sound")
-	To Formant ('method$')... time_step n_formants max_freq w_len 50
-	#To Formant ('method$')... time_step 5 5500 0.025 50
-	#Track... 3 550 1650 2750 3850 4950 1 1 1
-	Write to text file... 'filename_formant$'
+	# The file list alternates sound files and the formant files to write
+	Read Strings from raw text file... 'filelist$'
+	filelist = selected("Strings")
+	n_files = Get number of strings
+	n_files = n_files / 2
+	for i_file from 1 to n_files
+		select filelist
+		k = 2*i_file - 1
+		filename$ = Get string... k
+		k = 2*i_file
+		filename_formant$ = Get string... k
+		Read from file... 'filename$'
+		sound = selected("Sound")
+		To Formant ('method$')... time_step n_formants max_freq w_len 50
+		#To Formant ('method$')... time_step 5 5500 0.025 50
+		#Track... 3 550 1650 2750 3850 4950 1 1 1
+		Write to text file... 'filename_formant$'
+		plus sound
+		Remove
+	endfor
 	select all
 	Remove
 	clearinfo
@@ -79,19 +112,63 @@ if not os.path.exists(praat_path):
 
 #=================================================
 
-parser = argparse.ArgumentParser(description='Compute formants for a WAV file using Praat.', epilog='Written by Etienne Gaudrain <etienne.gaudrain@cnrs.fr>\nCopyright 2017 CNRS (FR), UMCG (NL)', formatter_class=argparse.RawDescriptionHelpFormatter)
-parser.add_argument('filename', metavar='FILE', help="The sound file to process.")
-parser.add_argument('--method', help="The method used to extract the formants (see Praat).", default='burg', choices=['burg'])
-parser.add_argument('--timestep', metavar='TIME_STEP', help="The time interval between two consecutive formant estimates (in seconds, default: 0.00625).", default=0.00625, type=float)
-parser.add_argument('--wlen', metavar='W_LEN', help="The analysis window length (in seconds, default: 0.025).", default=0.025, type=float)
-parser.add_argument('--maxfreq', metavar='MAX_FREQ', help="The maximal frequency (Hz, default: 5500).", default=5500, type=float)
-parser.add_argument('--nformants', metavar='N_FORMANTS', help="The number of resulting formants (default: 5).", default=5, type=float)
-parser.add_argument('--export', help="Format in which the data should be exported (default 'none'). If a file format is given, an output filename may also be provided or the progam will generate one and will return it.", default='none', choices=['none', 'matlabliteral', 'matfile', 'json', 'jsonfile'])
-parser.add_argument('--exportfile', help="File to which the data will be exported, if the export format is a file.")
-
-DEFAULT_VALUES = vars(parser.parse_args(['']))
-
-def call(args):
+DEFAULT_VALUES = {
+	'method': 'burg',
+	'timestep': 0.00625,
+	'wlen': 0.025,
+	'maxfreq': 5500,
+	'nformants': 5,
+	'export': 'none',
+	'exportfile': None
+}
+
+praat_script_name = __file__.replace('.py', '.praat')
+_praat_script_written = False
+
+def _write_praat_script():
+	"""Writes the Praat script next to this file, unless an up-to-date copy is already
+	there. The check is only done once per process."""
+	global _praat_script_written
+
+	if _praat_script_written and os.path.exists(praat_script_name):
+		return
+
+	try:
+		with open(praat_script_name, 'r') as fh:
+			up_to_date = fh.read() == praat_script
+	except OSError:
+		up_to_date = False
+
+	if not up_to_date:
+		# Written to a temporary file first so that concurrent processes never see a
+		# partially written script
+		# mkstemp creates the file as owner-only: keep the mode of the existing script,
+		# or use the default mode for new files
+		try:
+			mode = os.stat(praat_script_name).st_mode & 0o777
+		except OSError:
+			umask = os.umask(0)
+			os.umask(umask)
+			mode = 0o666 & ~umask
+		fd, tmp_name = tempfile.mkstemp(suffix='.praat', dir=os.path.dirname(praat_script_name))
+		try:
+			with os.fdopen(fd, 'w') as fh:
+				fh.write(praat_script)
+			os.chmod(tmp_name, mode)
+			os.replace(tmp_name, praat_script_name)
+		except BaseException:
+			try:
+				os.remove(tmp_name)
+			except OSError:
+				pass
+			raise
+
+	_praat_script_written = True
+
+def call(args, capture_output=True):
+	"""Extracts the formants of a single sound file. Returns the name of the formant
+	file, Praat's return code, stdout and stderr. If capture_output is False, Praat's
+	stdout is discarded and returned as None."""
 
 	if isinstance(args, argparse.Namespace):
 		args = vars(args)
@@ -101,33 +178,71 @@ def call(args):
 
 	args['filename'] = os.path.abspath(args['filename'])
 
-	root, ext = os.path.splitext(args['filename'])
-	filename_formant = root + '.formant'
+	options = {k: v for k, v in args.items() if k != 'filename'}
+	filenames_formant, returncode, stdout, stderr = call_batch([args['filename']], capture_output, **options)
+	return filenames_formant[0], returncode, stdout, stderr
+
+def call_batch(filenames, capture_output=True, **args):
+	"""Extracts the formants of several sound files with a single Praat process. Returns
+	the list of formant file names, Praat's return code, stdout and stderr. If
+	capture_output is False, Praat's stdout is discarded and returned as None."""
 
-	praat_script_name = __file__.replace('.py', '.praat')
+	for k in DEFAULT_VALUES:
+		if k not in args:
+			args[k] = DEFAULT_VALUES[k]
 
-	open(praat_script_name, 'w').write(praat_script)
+	filenames = [os.path.abspath(f) for f in filenames]
+	filenames_formant = [os.path.splitext(f)[0] + '.formant' for f in filenames]
 
-	cmd = [praat_path, '--run', praat_script_name, args['filename'], filename_formant, args['method'], str(args['timestep']), str(args['nformants']), str(args['maxfreq']), str(args['wlen'])]
+	_write_praat_script()
 
-	#print(subprocess.list2cmdline(cmd))
+	with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as fh:
+		for filename, filename_formant in zip(filenames, filenames_formant):
+			fh.write(filename + '\n' + filename_formant + '\n')
 
-	p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-	stdout, stderr = p.communicate()
-	return filename_formant, p.returncode, stdout, stderr
+	try:
+		cmd = [praat_path, '--run', praat_script_name, fh.name, args['method'], str(args['timestep']), str(args['nformants']), str(args['maxfreq']), str(args['wlen'])]
+
+		#print(subprocess.list2cmdline(cmd))
+
+		# stderr is always kept for error reporting
+		p = subprocess.Popen(cmd, stdout=subprocess.PIPE if capture_output else subprocess.DEVNULL, stderr=subprocess.PIPE)
+		stdout, stderr = p.communicate()
+	finally:
+		os.remove(fh.name)
+
+	return filenames_formant, p.returncode, stdout, stderr
 
 
 #=================================================
 
-RE_TYPE = type(re.compile(''))
+# Compiled once at import rather than for every parsed file. The patterns are bytes
+# so that they can run directly on the memory-mapped file.
+_NUMBER = rb'[0-9]+(?:\.[0-9]+)?(?:e[+-]?[0-9]+)?'
+_FIELD_RES = {keyword: re.compile(rb'%s\s*=\s*(%s)' % (keyword.encode('ascii'), _NUMBER))
+	for keyword in ['intensity', 'frequency', 'bandwidth']}
+# The per-frame count is called numberOfFormants by recent versions of Praat
+_FIELD_RES['nFormants'] = re.compile(rb'(?:nFormants|numberOfFormants)\s*=\s*(%s)' % _NUMBER)
+
+def _parse_numbers(values, dtype):
+	"""Converts a list of numbers written as bytes into an array, filled directly
+	without an intermediate list of Python floats."""
+	return numpy.fromiter(map(float, values), dtype=dtype, count=len(values))
+
+def _read_buffer(filename):
+	"""Returns the content of a file as a read-only memory map, or as bytes if the
+	file cannot be mapped (e.g. if it is empty)."""
+	with open(filename, 'rb') as fh:
+		try:
+			return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+		except (ValueError, OSError):
+			return fh.read()
 
 class Formants:
 	"""A class to represent and import formant information for a sound file."""
 	def __init__(self, wav_filename=None, **kwargs):
 
         #self.test = None
-		self.f = None
-		self.i = -1 # Current line index
 		self.data = None
 
 		if wav_filename is not None:
@@ -137,106 +252,158 @@ class Formants:
 		"""Opens and parses a Praat Text file containing formant information. The data is
 		then available in self.data."""
 
-		self.f = [x.strip() for x in open(filename, 'r')]
-		self.n = len(self.f) # Size of file
-		self.i = -1
-
-		if self.f[0] != 'File type = "ooTextFile"':
-			raise ValueError("The file isn't a valid Praat Text file (header: '%s')" % self.f[0])
-		if self.f[1] != 'Object class = "Formant 2"':
-			raise ValueError("The file isn't a valid Praat Formant 2 file (header: '%s')" % self.f[0])
-
-		self.i = 2
-
-		re_ = dict()
-		for keyword in ['xmin', 'xmax', 'nx', 'dx', 'x1', 'maxnFormants', 'intensity', 'frequency', 'bandwidth', 'nFormants']:
-			re_[keyword] = re.compile(r'%s\s*=\s*([0-9]+(?:\.[0-9]+)?(?:e[+-]?[0-9]+)?)' % keyword)
-		re_['frames_array'] = re.compile(r'frames\s*\[\s*\]:')
-		re_['frames'] = re.compile(r'frames\s*\[([0-9]+)\]:')
-		re_['formant_array'] = re.compile(r'formant\s*\[\s*\]:')
-		re_['formant'] = re.compile(r'formant\s*\[([0-9]+)\]:')
+		buf = _read_buffer(filename)
+		try:
+			self._parse_praat_text(buf)
+		finally:
+			if isinstance(buf, mmap.mmap):
+				buf.close()
+
+	def _parse_praat_text(self, buf):
+		"""Parses the content of a Praat Text formant file given as a bytes-like buffer."""
+
+		eol1 = buf.find(b'\n')
+		eol2 = buf.find(b'\n', eol1+1)
+		file_type = buf[:eol1].strip()
+		object_class = buf[eol1+1:eol2].strip()
+		if file_type != b'File type = "ooTextFile"':
+			raise ValueError("The file isn't a valid Praat Text file (header: '%s')" % file_type.decode('utf-8', 'replace'))
+		if object_class != b'Object class = "Formant 2"':
+			raise ValueError("The file isn't a valid Praat Formant 2 file (header: '%s')" % object_class.decode('utf-8', 'replace'))
 
 		#--------
 		self.data = dict()
+		# The scalar fields are simple 'key = value' lines before the frames
+		pos = buf.find(b'frames [', eol2)
+		if pos < 0:
+			pos = len(buf)
+		for line in buf[eol2:pos].splitlines():
+			key, sep, value = line.partition(b'=')
+			key = key.strip().decode('ascii', 'replace')
+			if sep and key in ['xmin', 'xmax', 'nx', 'dx', 'x1', 'maxnFormants']:
+				self.data[key] = float(value)
 		for k in ['xmin', 'xmax', 'nx', 'dx', 'x1', 'maxnFormants']:
-			self._find_line(re_[k])
-			self.data[k] = float(self.last_match.group(1))
+			if k not in self.data:
+				raise ValueError("The file isn't a valid Praat Formant 2 file ('%s' is missing)" % k)
 		self.data['nx'] = int(self.data['nx'])
 		self.data['maxnFormants'] = int(self.data['maxnFormants'])
 
-		self.data['t'] = list()
-		self.data['formants'] = list()
-		self.data['bandwidths'] = list()
-		self.data['intensity'] = list()
-
-		self._find_line(re_['frames_array'])
-		while self._find_line(re_['frames']):
-			frame = int(self.last_match.group(1))-1
-			#print("Frame:", frame, 'on line', self.i)
-			self.data['t'].append(self.data['x1']+frame*self.data['dx'])
-
-			self._find_line(re_['intensity'])
-			self.data['intensity'].append(float(self.last_match.group(1)))
-
-			i_frame = self.i
-
-			if self._find_line(re_['frames'], self.i+1):
-				next_frame = self.i
-			else:
-				next_frame = self.n
-			#print("  Next frame ->", next_frame)
-
-			self.i = i_frame
-			self._find_line(re_['formant_array'])
-            #print("  Formant [] on line", self.i)
-			formants = [numpy.nan]*self.data['maxnFormants']  # Should be the number of requested formants
-			bandwidths = [numpy.nan]*self.data['maxnFormants']  # Should be the number of requested formants
-			while self._find_line(re_['formant']):
-				formant_i = int(self.last_match.group(1))-1
-
-				#print(('    formant [%d] on line' % formant_i), self.i)
-
-				if self.i > next_frame:
-					self.i = next_frame
-					break
-
-				self._find_line(re_['frequency'])
-				frq = float(self.last_match.group(1))
-				formants[formant_i] = frq
-
-				#print("    frequency on line", self.i)
-
-				self._find_line(re_['bandwidth'])
-				bw = float(self.last_match.group(1))
-				bandwidths[formant_i] = bw
-
-				#print("    bandwidth on line", self.i)
-
-			self.data['formants'].append(formants)
-			self.data['bandwidths'].append(bandwidths)
-
-
-	def _find_line(self, pattern, i=None):
-		"""A helper function to find a line in a text file."""
-
-		if i is None:
-			i = self.i
-
-		if isinstance(pattern, RE_TYPE):
-			for k in range(i,self.n):
-				self.last_match = pattern.match(self.f[k])
-				if self.last_match is not None:
-					self.i = k
-					return self.f[k]
-
-		elif isinstance(pattern, str):
-			for k in range(i,self.n):
-				if self.f[k].startswith(pattern):
-					self.i = k
-					return self.f[k]
-
-		return False
+		# Frames without a given formant are left as NaN
+		nx = self.data['nx']
+		formants = numpy.full((nx, self.data['maxnFormants']), numpy.nan, dtype=numpy.float32)
+		bandwidths = numpy.full((nx, self.data['maxnFormants']), numpy.nan, dtype=numpy.float32)
+
+		# Each per-frame field is collected in a single scan of the file by the regex
+		# engine, and the values are then scattered into the arrays by NumPy. The frames,
+		# and the formants within a frame, are written in order by Praat.
+		n_formants = _parse_numbers(_FIELD_RES['nFormants'].findall(buf, pos), int)
+		intensity = _parse_numbers(_FIELD_RES['intensity'].findall(buf, pos), numpy.float64)
+		frq = _parse_numbers(_FIELD_RES['frequency'].findall(buf, pos), numpy.float64)
+		bw = _parse_numbers(_FIELD_RES['bandwidth'].findall(buf, pos), numpy.float64)
+
+		if len(n_formants) != nx or len(intensity) != nx or len(frq) != n_formants.sum() or len(bw) != len(frq):
+			raise ValueError("The file isn't a valid Praat Formant 2 file (inconsistent number of frames or formants)")
+
+		frame_i = numpy.repeat(numpy.arange(nx), n_formants)
+		formant_i = numpy.arange(len(frq)) - numpy.repeat(numpy.cumsum(n_formants) - n_formants, n_formants)
+		formants[frame_i, formant_i] = frq
+		bandwidths[frame_i, formant_i] = bw
+
+		self.data['t'] = self.data['x1'] + numpy.arange(nx, dtype=numpy.float64)*self.data['dx']
+		self.data['formants'] = formants
+		self.data['bandwidths'] = bandwidths
+		self.data['intensity'] = intensity
+
+
+	def from_praat_binary(self, filename):
+		"""Opens and parses a Praat binary file containing formant information, as written
+		by Praat's 'Write to binary file...'. This is much faster than parsing the text
+		format as no number needs to be converted from text. The data is then available
+		in self.data.
+
+		Warning: this reader has not been tested on files written by Praat itself, only
+		on files built by hand to the layout described in _parse_praat_binary. Prefer
+		from_praat_text unless you have checked that both give the same result on your
+		files."""
+
+		buf = _read_buffer(filename)
+		try:
+			self._parse_praat_binary(buf)
+		finally:
+			if isinstance(buf, mmap.mmap):
+				buf.close()
+
+	def _parse_praat_binary(self, buf):
+		"""Parses the content of a Praat binary formant file given as a bytes-like buffer.
+
+		The file starts with 'ooBinaryFile' and the class name preceded by its length on
+		one byte. The numbers are big-endian: xmin, xmax (double), nx (int32), dx, x1
+		(double), maxnFormants, then for each frame the intensity (double), nFormants, and
+		nFormants (frequency, bandwidth) pairs of doubles. The two counts have been
+		stored on 16 or 32 bits depending on Praat's version, so both are tried and the
+		layout that accounts for the whole file is kept."""
+
+		if len(buf) < 13 or buf[:12] != b'ooBinaryFile':
+			raise ValueError("The file isn't a valid Praat binary file (header: %r)" % bytes(buf[:12]))
+		n = buf[12]
+		object_class = bytes(buf[13:13+n])
+		if object_class != b'Formant 2':
+			raise ValueError("The file isn't a valid Praat Formant 2 file (class: '%s')" % object_class.decode('utf-8', 'replace'))
 
+		#--------
+		pos = 13+n
+		self.data = dict()
+		try:
+			self.data['xmin'], self.data['xmax'], self.data['nx'], self.data['dx'], self.data['x1'] = struct.unpack_from('>ddidd', buf, pos)
+		except struct.error:
+			raise ValueError("The file isn't a valid Praat Formant 2 file (truncated header)")
+		pos += struct.calcsize('>ddidd')
+
+		for count_format in ['h', 'i']:
+			try:
+				maxnFormants, formants, bandwidths, intensity = self._parse_praat_binary_frames(buf, pos, count_format)
+				break
+			except (ValueError, struct.error):
+				continue
+		else:
+			raise ValueError("The file isn't a valid Praat Formant 2 file (unexpected frame layout)")
+
+		# Same field order as from_praat_text
+		self.data['maxnFormants'] = maxnFormants
+		self.data['t'] = self.data['x1'] + numpy.arange(self.data['nx'], dtype=numpy.float64)*self.data['dx']
+		self.data['formants'] = formants
+		self.data['bandwidths'] = bandwidths
+		self.data['intensity'] = intensity
+
+	def _parse_praat_binary_frames(self, buf, pos, count_format):
+		"""Reads maxnFormants and the frames of a binary formant file, with the counts
+		stored in the given struct format. Returns maxnFormants, and the formants,
+		bandwidths and intensity arrays."""
+
+		nx = self.data['nx']
+		maxnFormants, = struct.unpack_from('>'+count_format, buf, pos)
+		pos += struct.calcsize('>'+count_format)
+
+		intensity = numpy.empty(nx)
+		formants = numpy.full((nx, maxnFormants), numpy.nan, dtype=numpy.float32)
+		bandwidths = numpy.full((nx, maxnFormants), numpy.nan, dtype=numpy.float32)
+
+		frame_format = '>d'+count_format
+		frame_size = struct.calcsize(frame_format)
+		for frame in range(nx):
+			intensity[frame], n_formants = struct.unpack_from(frame_format, buf, pos)
+			pos += frame_size
+			if not 0 <= n_formants <= maxnFormants:
+				raise ValueError('Invalid number of formants')
+			values = struct.unpack_from('>%dd' % (2*n_formants), buf, pos)
+			pos += 16*n_formants
+			formants[frame, :n_formants] = values[0::2]
+			bandwidths[frame, :n_formants] = values[1::2]
+
+		if pos != len(buf):
+			raise ValueError('Unexpected trailing data')
+
+		return maxnFormants, formants, bandwidths, intensity
 
 	def to_matlab_literal(self):
 		"""Export to Matlab literal (string) that can be interpreted with eval()."""
@@ -255,23 +422,21 @@ class Formants:
 		if not self._is_iterable(a):
 			return str(a)
 
-		if self._is_iterable(a[0]):
+		if len(a) > 0 and self._is_iterable(a[0]):
 			# We're assuming only dimension 2 table, if there is more depth, it will produce unexpected results
 			return "["+(";".join([",".join([str(y) for y in x]) for x in a]))+"]"
 		else:
 			return "["+(",".join([str(x) for x in a]))+"]"
 
 	def _is_iterable(self, a):
-		try:
-			iter(a)
-			return True
-		except Exception:
-			return False
+		return isinstance(a, (list, tuple, numpy.ndarray))
 
-	def to_matlab_mat(self, mat_filename):
-		"""Export to Matlab MAT file."""
+	def to_matlab_mat(self, mat_filename, compress=False):
+		"""Export to Matlab MAT file. The file is not compressed by default: the formant
+		tables are stored as float32 already, and uncompressed MAT files are faster to
+		write and to load in Matlab."""
 		import scipy.io
-		scipy.io.savemat(mat_filename, self.data, do_compression=True)
+		scipy.io.savemat(mat_filename, self.data, do_compression=compress)
 
 	def from_wav_file(self, wav_filename, **kwargs):
 
@@ -282,19 +447,154 @@ class Formants:
 			if k not in args:
 				args[k] = DEFAULT_VALUES[k]
 
-		filename_formant, c, o, e = call(args)
+		filename_formant, c, o, e = call(args, capture_output=False)
 
 		if c!=0:
 			raise Exception(e)
 
 		self.from_praat_text(filename_formant)
 
+	@classmethod
+	def from_wav_files(cls, wav_filenames, n_workers=None, **kwargs):
+		"""Extracts the formants of several sound files in parallel. The files are split
+		in n_workers batches (default: the number of CPUs), each processed by one Praat
+		call in a separate process. Returns a list of Formants objects in the same order
+		as wav_filenames."""
+
+		wav_filenames = list(wav_filenames)
+		if not wav_filenames:
+			return list()
+
+		if n_workers is None:
+			n_workers = os.cpu_count() or 1
+		n_workers = min(n_workers, len(wav_filenames))
+		batch_size = -(-len(wav_filenames) // n_workers)
+		batches = [wav_filenames[i:i+batch_size] for i in range(0, len(wav_filenames), batch_size)]
+
+		# Make sure the workers find an up-to-date script
+		_write_praat_script()
+
+		with ProcessPoolExecutor(len(batches)) as ex:
+			results = ex.map(_extract_batch, [cls]*len(batches), batches, [kwargs]*len(batches))
+			return [f for batch in results for f in batch]
+
+	def from_wav_array(self, y, sr, **kwargs):
+		"""Estimates the formants of a sound given as an array, without calling Praat.
+		The options are the same as for from_wav_file. The procedure mimics Praat's
+		approach (resampling to twice maxfreq, pre-emphasis from 50 Hz, Gaussian window
+		twice as long as wlen, 2*nformants LPC poles), but uses autocorrelation LPC
+		instead of Burg's method, so the values will differ slightly from Praat's.
+		The data is then available in self.data."""
+
+		from fractions import Fraction
+		import scipy.signal
+
+		args = dict(DEFAULT_VALUES)
+		args.update(kwargs)
+		timestep = args['timestep']
+		maxfreq = args['maxfreq']
+		nformants = int(args['nformants'])
+		order = 2*nformants
+
+		y = numpy.asarray(y)
+		if numpy.issubdtype(y.dtype, numpy.integer):
+			y = y / numpy.iinfo(y.dtype).max
+		y = numpy.asarray(y, dtype=numpy.float64)
+		if y.ndim > 1:
+			y = y.mean(axis=1)
+		duration = len(y) / sr
+
+		# Resample to twice the maximal formant frequency
+		if sr > 2*maxfreq:
+			ratio = Fraction(2*maxfreq / sr).limit_denominator(1000)
+			y = scipy.signal.resample_poly(y, ratio.numerator, ratio.denominator)
+			sr = sr * ratio.numerator / ratio.denominator
+
+		# Pre-emphasis from 50 Hz (out of place, y may be the caller's array)
+		y = numpy.concatenate((y[:1], y[1:] - numpy.exp(-2*numpy.pi*50/sr) * y[:-1]))
+
+		# Frames centred in the sound, as in Praat
+		nw = int(round(2*args['wlen']*sr))
+		nx = max(math.floor((duration - 2*args['wlen']) / timestep) + 1, 0)
+		x1 = 0.5*(duration - (nx-1)*timestep)
+		starts = numpy.clip(numpy.round((x1 + numpy.arange(nx)*timestep)*sr - nw/2).astype(int), 0, None)
+		y = numpy.concatenate((y, numpy.zeros(max(nw + (starts[-1] if nx else 0) - len(y), 0))))
+		i = numpy.arange(nw)
+		edge = numpy.exp(-12)
+		window = (numpy.exp(-48*(i - (nw-1)/2)**2 / (nw+1)**2) - edge) / (1 - edge)
+		frames = y[starts[:, None] + i] * window
+
+		# Autocorrelation and Levinson-Durbin recursion, vectorized across frames
+		nfft = 1 << int(numpy.ceil(numpy.log2(2*nw)))
+		r = numpy.fft.irfft(numpy.abs(numpy.fft.rfft(frames, nfft))**2)[:, :order+1]
+		a = numpy.zeros((nx, order+1))
+		a[:, 0] = 1
+		err = r[:, 0].copy()
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			for p in range(1, order+1):
+				k = -(r[:, p] + (a[:, 1:p] * r[:, p-1:0:-1]).sum(axis=1)) / err
+				k[~numpy.isfinite(k)] = 0
+				a[:, 1:p] += k[:, None] * a[:, p-1:0:-1]
+				a[:, p] = k
+				err *= 1 - k**2
+
+		# Roots of the LPC polynomials as eigenvalues of their companion matrices
+		companion = numpy.zeros((nx, order, order))
+		companion[:, 0, :] = -a[:, 1:]
+		companion[:, numpy.arange(1, order), numpy.arange(order-1)] = 1
+		roots = numpy.linalg.eigvals(companion)
+
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			frequencies = numpy.angle(roots) * sr / (2*numpy.pi)
+			bandwidths = -numpy.log(numpy.abs(roots)) * sr / numpy.pi
+		# Same safety margin as Praat
+		valid = (roots.imag > 0) & (frequencies > 50) & (frequencies < maxfreq-50)
+		frequencies[~valid] = numpy.nan
+		order_i = numpy.argsort(frequencies, axis=1)[:, :nformants]
+
+		self.data = dict()
+		self.data['xmin'] = 0.
+		self.data['xmax'] = duration
+		self.data['nx'] = nx
+		self.data['dx'] = timestep
+		self.data['x1'] = x1
+		self.data['maxnFormants'] = nformants
+		self.data['t'] = x1 + numpy.arange(nx, dtype=numpy.float64)*timestep
+		self.data['formants'] = numpy.take_along_axis(frequencies, order_i, axis=1).astype(numpy.float32)
+		self.data['bandwidths'] = numpy.take_along_axis(numpy.where(valid, bandwidths, numpy.nan), order_i, axis=1).astype(numpy.float32)
+		self.data['intensity'] = (frames**2).mean(axis=1)
+
+def _extract_batch(cls, wav_filenames, args):
+	"""Worker for Formants.from_wav_files."""
+
+	filenames_formant, c, o, e = call_batch(wav_filenames, capture_output=False, **args)
+
+	if c!=0:
+		raise Exception(e)
+
+	formants = list()
+	for filename_formant in filenames_formant:
+		f = cls()
+		f.from_praat_text(filename_formant)
+		formants.append(f)
+	return formants
+
 
 
 #=================================================
 
 if __name__=='__main__':
 
+	parser = argparse.ArgumentParser(description='Compute formants for a WAV file using Praat.', epilog='Written by Etienne Gaudrain <etienne.gaudrain@cnrs.fr>\nCopyright 2017 CNRS (FR), UMCG (NL)', formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('filename', metavar='FILE', help="The sound file to process.")
+	parser.add_argument('--method', help="The method used to extract the formants (see Praat).", default='burg', choices=['burg'])
+	parser.add_argument('--timestep', metavar='TIME_STEP', help="The time interval between two consecutive formant estimates (in seconds, default: 0.00625).", default=0.00625, type=float)
+	parser.add_argument('--wlen', metavar='W_LEN', help="The analysis window length (in seconds, default: 0.025).", default=0.025, type=float)
+	parser.add_argument('--maxfreq', metavar='MAX_FREQ', help="The maximal frequency (Hz, default: 5500).", default=5500, type=float)
+	parser.add_argument('--nformants', metavar='N_FORMANTS', help="The number of resulting formants (default: 5).", default=5, type=float)
+	parser.add_argument('--export', help="Format in which the data should be exported (default 'none'). If a file format is given, an output filename may also be provided or the progam will generate one and will return it.", default='none', choices=['none', 'matlabliteral', 'matfile', 'json', 'jsonfile'])
+	parser.add_argument('--exportfile', help="File to which the data will be exported, if the export format is a file.")
+
 	args = parser.parse_args()
 	filename_formant, c, o, e = call(args)
 
@@ -315,11 +615,10 @@ if __name__=='__main__':
 			f.to_matlab_mat(args.exportfile)
 			print((args.exportfile))
 		elif args.export == 'json':
-			import json
-			print((json.dumps(f.data)))
+			print((_json_dumps(f.data).decode('utf-8')))
 		elif args.export == 'jsonfile':
-			import json
 			if args.exportfile is None:
 				args.exportfile = filename_formant + '.json'
-			json.dump(f.data, open(args.exportfile, 'wb'))
+			with open(args.exportfile, 'wb') as fh:
+				fh.write(_json_dumps(f.data))
 			print((args.exportfile))